@@ -0,0 +1,126 @@
+import argparse
+import math
+import time
+
+import main as cannon
+
+# Settings tried, s; a frame_step finer than time_step only repeats points, so those pairs are skipped
+default_time_steps = [0.2, 0.1, 0.05, 0.02, 0.01, 0.005]
+default_frame_steps = [0.2, 0.1, 0.05]
+
+def reference_flight(shot, dt):
+    # Fine-step RK4 solution of the same equations, used only as the yardstick:
+    # returns the landing point interpolated to y = 0 and the apex height
+    angle = shot["angle_grad"] * math.pi / 180
+    speed = math.sqrt((2 * shot["efficiency"] * cannon.q * shot["gunpowder"]) / (100 * shot["m"]))
+    c = 0.5 * cannon.air_density * cannon.drag_coefficient * shot["cross_sectional_area"] / shot["m"] \
+        if shot["apply_air_resistance"] else 0.0
+
+    def acceleration(vx, vy):
+        v = math.sqrt(vx * vx + vy * vy)
+        return -c * v * vx, -cannon.g - c * v * vy
+
+    x, y = shot["x0"], shot["y0"]
+    vx, vy = speed * math.cos(angle), speed * math.sin(angle)
+    apex = y
+    while True:
+        x_prev, y_prev = x, y
+        ax1, ay1 = acceleration(vx, vy)
+        vx2, vy2 = vx + ax1 * dt / 2, vy + ay1 * dt / 2
+        ax2, ay2 = acceleration(vx2, vy2)
+        vx3, vy3 = vx + ax2 * dt / 2, vy + ay2 * dt / 2
+        ax3, ay3 = acceleration(vx3, vy3)
+        vx4, vy4 = vx + ax3 * dt, vy + ay3 * dt
+        ax4, ay4 = acceleration(vx4, vy4)
+        x += (vx + 2 * vx2 + 2 * vx3 + vx4) * dt / 6
+        y += (vy + 2 * vy2 + 2 * vy3 + vy4) * dt / 6
+        vx += (ax1 + 2 * ax2 + 2 * ax3 + ax4) * dt / 6
+        vy += (ay1 + 2 * ay2 + 2 * ay3 + ay4) * dt / 6
+        apex = max(apex, y)
+        if y < 0:
+            return x_prev + (x - x_prev) * y_prev / (y_prev - y), apex
+
+def fire(shot, time_step, frame_step, repeat):
+    # Runs the app's own Fire computation (compute_shot, as used by replay) with the given settings
+    cannon.set_params(dict(shot, time_step=time_step, frame_step=frame_step))
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        track_x, track_y = cannon.compute_shot()
+        best = min(best, time.perf_counter() - start)
+    return track_x, track_y, best
+
+def integration_steps(shot, time_step):
+    state = cannon.init_projectiles(shot["angle_grad"], shot["gunpowder"], shot["efficiency"], shot["m"],
+                                    shot["cross_sectional_area"], shot["x0"], shot["y0"], dt=time_step)
+    _, _, steps = cannon.integrate_projectiles(state, dt=time_step, drag=shot["apply_air_resistance"])
+    return int(steps)
+
+def study(shot, time_steps, frame_steps, reference_dt, repeat):
+    reference_landing, reference_apex = reference_flight(shot, reference_dt)
+    runs = []
+    for time_step in time_steps:
+        for frame_step in frame_steps:
+            if frame_step < time_step:
+                continue
+            track_x, track_y, wall_time = fire(shot, time_step, frame_step, repeat)
+            runs.append({
+                "time_step": time_step,
+                "frame_step": frame_step,
+                # The app ends the drawn track at the first point below ground, without interpolating
+                "end_error": abs(track_x[-1] - reference_landing),
+                "apex_error": abs(max(track_y) - reference_apex),
+                "frames": len(cannon.update_config()),
+                "steps": integration_steps(shot, time_step),
+                "wall_time": wall_time,
+            })
+    return reference_landing, reference_apex, runs
+
+def cheapest(runs, tolerance):
+    # Ranked on steps x frames, which Fire's cost tracks; wall time is only reported, since it
+    # varies with machine load and would make the pick change from run to run
+    candidates = [run for run in runs if max(run["end_error"], run["apex_error"]) <= tolerance]
+    return min(candidates, key=lambda run: (run["steps"] * run["frames"], run["frames"]), default=None)
+
+def main():
+    defaults = cannon.current_shot()
+    parser = argparse.ArgumentParser(description="Accuracy vs cost of the Cannon Lab time_step and frame_step")
+    parser.add_argument("--angle", type=float, default=defaults["angle_grad"], help="°")
+    parser.add_argument("--gunpowder", type=float, default=defaults["gunpowder"], help="g")
+    parser.add_argument("--efficiency", type=float, default=defaults["efficiency"], help="%%")
+    parser.add_argument("--mass", type=float, default=defaults["m"], help="projectile mass, kg")
+    parser.add_argument("--area", type=float, default=defaults["cross_sectional_area"], help="cross-sectional area, m²")
+    parser.add_argument("--y0", type=float, default=defaults["y0"], help="starting height, m")
+    parser.add_argument("--no-drag", action="store_true", help="disable air resistance")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="allowed error of the drawn landing point and apex, m")
+    parser.add_argument("--time-steps", type=float, nargs="+", default=default_time_steps, help="time_step values, s")
+    parser.add_argument("--frame-steps", type=float, nargs="+", default=default_frame_steps, help="frame_step values, s")
+    parser.add_argument("--reference-dt", type=float, default=1e-4, help="RK4 step of the reference solution, s")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per configuration (best is kept)")
+    args = parser.parse_args()
+
+    current = (cannon.time_step, cannon.frame_step)
+    shot = {"angle_grad": args.angle, "gunpowder": args.gunpowder, "efficiency": args.efficiency, "m": args.mass,
+            "cross_sectional_area": args.area, "x0": 0.0, "y0": args.y0, "apply_air_resistance": not args.no_drag}
+    reference_landing, reference_apex, runs = study(shot, args.time_steps, args.frame_steps,
+                                                    args.reference_dt, args.repeat)
+
+    print(f"Reference (rk4, dt = {args.reference_dt} s): landing {reference_landing:.4f} m, apex {reference_apex:.4f} m")
+    print(f"{'time_step':>10} {'frame_step':>11} {'end err, m':>11} {'apex err, m':>12} {'steps':>6} {'frames':>7} "
+          f"{'Fire, ms':>9}")
+    for run in runs:
+        print(f"{run['time_step']:>10g} {run['frame_step']:>11g} {run['end_error']:>11.3e} {run['apex_error']:>12.3e} "
+              f"{run['steps']:>6d} {run['frames']:>7d} {run['wall_time'] * 1000:>9.2f}")
+
+    print(f"\nCurrent settings: time_step = {current[0]} s, frame_step = {current[1]} s")
+    best = cheapest(runs, args.tolerance)
+    if best is None:
+        print(f"No configuration meets the {args.tolerance} m tolerance; try smaller --time-steps/--frame-steps")
+        return
+    print(f"Cheapest within {args.tolerance} m: time_step = {best['time_step']} s, frame_step = {best['frame_step']} s "
+          f"({best['steps']} steps x {best['frames']} frames, {best['wall_time'] * 1000:.2f} ms per Fire)")
+    print(f"Run with: python main.py --dt {best['time_step']} --frame-dt {best['frame_step']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+async def post(reader, writer, path, payload):
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+
+    status = (await reader.readline()).split(b" ", 2)[1]
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status == b"200"
+
+async def worker(host, port, endpoint, shots, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while shots:
+            shot = shots.pop()
+            start = time.perf_counter()
+            ok = await post(reader, writer, endpoint, shot)
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors.append(shot)
+    finally:
+        writer.close()
+
+async def fetch_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b"GET /stats HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+def make_request(endpoint, rng):
+    if endpoint == "/sweep":
+        return {"param": "angle_grad", "values": [rng.choice(range(10, 80, 5)) + offset for offset in range(5)]}
+    if endpoint == "/aim":
+        return {"target_x": rng.choice(range(150, 350, 10)), "goal_y": 10}
+    return {"angle_grad": rng.choice(range(10, 80)), "gunpowder": rng.choice(range(5, 15))}
+
+async def run(args):
+    rng = random.Random(args.seed)
+    # A fixed pool of distinct requests controls how often the server cache can answer
+    pool = [make_request(args.endpoint, rng) for _ in range(args.distinct)]
+    shots = [rng.choice(pool) for _ in range(args.requests)]
+    latencies, errors = [], []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(args.host, args.port, args.endpoint, shots, latencies, errors)
+                           for _ in range(args.connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f"{args.endpoint}: {len(latencies)} requests over {args.connections} connections in {elapsed:.2f} s")
+    print(f"  throughput: {len(latencies) / elapsed:.0f} req/s, errors: {len(errors)}")
+    print(f"  latency ms: p50 {np.percentile(latencies_ms, 50):.2f}, p90 {np.percentile(latencies_ms, 90):.2f}, "
+          f"p99 {np.percentile(latencies_ms, 99):.2f}, max {latencies_ms.max():.2f}")
+
+    stats = await fetch_stats(args.host, args.port)
+    if stats["batches"]:
+        print(f"  server: {stats['batched_shots'] / stats['batches']:.1f} shots per batch, "
+              f"{stats['cache_hits']} cache hits / {stats['cache_hits'] + stats['cache_misses']} lookups")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the Cannon Lab simulation server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--endpoint", default="/simulate", choices=["/simulate", "/sweep", "/aim"])
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--distinct", type=int, default=500, help="number of different requests in the mix")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
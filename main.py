@@ -1,10 +1,16 @@
+import time
+
+startup_begin = time.perf_counter()
+
+import argparse
+import json
+import os
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.gridspec import GridSpec
-from matplotlib.widgets import Button
-from matplotlib.animation import FuncAnimation
-import tkinter as tk
-from tkinter import messagebox as mbox
+
+# matplotlib and tkinter are only imported once the window is built (see import_gui/get_root),
+# so replays, the server and the convergence tool start without them
+plt = GridSpec = Button = None
+tk = mbox = None
 
 # Colors:
 bg_color = "#cbc5b3"
@@ -13,46 +19,11 @@ main_color_1 = "#ff7f0e"
 main_color_2 = "#71b1d0"
 saved_color = "#ff7f0e"  # Color for saved trajectories
 
-plt.style.use('Solarize_Light2')
-
-fig = plt.figure()
-fig.patch.set_facecolor("#d9d3c0")
-fig.suptitle("Cannon Lab", fontsize=14, fontweight="bold", color = "#ff7f0e")
-
-# Proportions:
-hs = [15/50, 15/50, 5/50, 5/50, 5/50, 5/50]  # Adjusted to make top bars taller
-ws = [1/8, 1/8, 1/8, 1/8, 1/8, 1/8, 1/8, 1/8]
-
-gs = GridSpec(ncols=8, nrows=6, width_ratios=ws, height_ratios=hs, figure=fig)
-
-# Top Bars:
-ax_impulses = plt.subplot(gs[0, :3], facecolor=bg_color)
-impulse_bar = ax_impulses.bar(["Projectile", "Cannon (1)", "Cannon (2)"], [0, 0, 0], color=main_color_1)
-plt.xlabel("Impulses, kg*m/s")
-plt.grid(True)
-
-ax_forces = plt.subplot(gs[0, 3:6], facecolor=bg_color)
-force_bar = ax_forces.bar(["Friction C", "Reaction C", "Gravity P"], [0, 0, 0], color=main_color_1)
-plt.xlabel("Forces, N")
-plt.grid(True)
-
-ax_velocities = plt.subplot(gs[0, 6:], facecolor=bg_color)
-velocity_bar = ax_velocities.bar(["Initial P", "X-coordinate P", "Initial C"], [0, 0, 0], color=main_color_1)
-plt.xlabel("Velocities, m/s")
-plt.grid(True)
-
-# Main plane:
-ax = plt.subplot(gs[1:, :], facecolor=bg_color)
-ax.set_aspect("auto")
-
-plt.xlabel("x, m")
-plt.ylabel("y, m")
-plt.grid(True)
-
 def add_value_labels(ax, bars):
+    labels = []
     for bar in bars:
         height = bar.get_height()
-        ax.text(
+        labels.append(ax.text(
             bar.get_x() + bar.get_width() / 2,
             height / 2,
             f'{height:.2f}',
@@ -61,7 +32,25 @@ def add_value_labels(ax, bars):
             color='black',
             fontsize=12,
             fontweight='bold'
-        )
+        ))
+    return labels
+
+def update_value_labels(labels, bars):
+    # Move the existing text artists instead of creating new ones
+    for label, bar in zip(labels, bars):
+        height = bar.get_height()
+        label.set_y(height / 2)
+        label.set_text(f'{height:.2f}')
+
+def rescale_bars(ax, heights):
+    # Only touch the limits when they actually change
+    bottom = min(0.0, min(heights)) * 1.05
+    top = max(0.0, max(heights)) * 1.05
+    if top == bottom:
+        top = bottom + 1
+    current_bottom, current_top = ax.get_ylim()
+    if (current_bottom, current_top) != (bottom, top):
+        ax.set_ylim(bottom, top)
 
 # Initial values and constants
 angle_grad = 45  # °
@@ -85,6 +74,10 @@ cross_sectional_area = 0.00981  # m^2, example value
 # Control for air resistance
 apply_air_resistance = True
 
+# Integrator settings (see convergence.py for their accuracy/cost trade-off)
+time_step = 0.1  # s, integration step
+frame_step = 0.1  # s, simulated time between animation frames
+
 angle = 0
 initial_speed = 0
 time_interval = 0
@@ -99,8 +92,43 @@ hit_check = False
 # To store multiple trajectories
 trajectories = []
 
+# Startup stages, s since startup_begin
+startup_times = {}
+
+# Created on first use
+gs = None
+ax_impulses = ax_forces = ax_velocities = None
+root = None
+
+# Cache for the bar chart quantities, keyed on the parameters they depend on
+bar_data_cache = {"key": None, "data": None}
+
 anim = None  # Ensuring the animation object is not deleted
 
+shot_sensitivities = None  # Gradients of range and hit height for the last aimed shot
+
+# Salvo mode
+salvo_size = 5  # number of cannons
+salvo_delay = 0.5  # s between successive guns firing
+salvo_spacing = 10  # m between neighbouring guns
+salvo_spread = 2  # ° angle step between neighbouring guns
+# Per-gun values, one entry per gun (or a single entry for all of them);
+# an empty list uses the matching single-shot parameter for every gun
+salvo_angles = []  # °, empty steps angle_grad by salvo_spread
+salvo_gunpowder = []  # g
+salvo_efficiency = []  # %
+salvo_m = []  # kg, projectiles
+salvo_M = []  # kg, cannons
+salvo_area = []  # m^2
+salvo_recoil = np.zeros(salvo_size)  # m, recoil accumulated by each gun over successive salvos
+
+# Session recording
+event_log = None  # Open session log file, if recording
+session_params = ["angle_grad", "gunpowder", "efficiency", "x0", "y0", "target_x", "target_height", "m", "M",
+                  "cross_sectional_area", "apply_air_resistance", "salvo_size", "salvo_delay", "salvo_spread",
+                  "salvo_spacing", "salvo_angles", "salvo_gunpowder", "salvo_efficiency", "salvo_m", "salvo_M",
+                  "salvo_area", "time_step", "frame_step"]
+
 def compute_drag_force(v):
     # Use the global variable for cross-sectional area
     global air_density, drag_coefficient, cross_sectional_area
@@ -109,7 +137,7 @@ def compute_drag_force(v):
 def compute_position_with_drag(time):
     global x_offset, y_offset, angle, initial_speed, m, g, cross_sectional_area
 
-    dt = 0.1  # time step
+    dt = time_step
     x, y = x_offset, y_offset
     vx, vy = initial_speed * np.cos(angle), initial_speed * np.sin(angle)
 
@@ -133,6 +161,261 @@ def compute_position_with_drag(time):
 
     return x, y
 
+# Parameters the shot sensitivities are taken with respect to
+sensitivity_params = ["angle_grad", "gunpowder", "efficiency", "m", "M", "cross_sectional_area"]
+
+def propagate_sensitivities(angle_grad, gunpowder, efficiency, m, M, cross_sectional_area,
+                            x0=0, y0=0, target_x=None, drag=True, dt=None, max_steps=100000):
+    # Same explicit scheme as compute_position_with_drag, with the tangent (d state / d parameter)
+    # equations integrated alongside the state so all gradients come out of a single pass.
+    # M only affects the cannon, so its derivatives are zero for the projectile quantities.
+    dt = dt or time_step
+    n = len(sensitivity_params)
+    e = {name: np.eye(n)[i] for i, name in enumerate(sensitivity_params)}
+
+    angle = angle_grad * np.pi / 180
+    d_angle = e["angle_grad"] * np.pi / 180
+    speed = np.sqrt((2 * efficiency * q * gunpowder) / (100 * m))
+    d_speed = speed * (e["gunpowder"] / (2 * gunpowder) + e["efficiency"] / (2 * efficiency) - e["m"] / (2 * m))
+
+    x, y = x0, y0
+    vx, vy = speed * np.cos(angle), speed * np.sin(angle)
+    dx, dy = np.zeros(n), np.zeros(n)
+    dvx = d_speed * np.cos(angle) - speed * np.sin(angle) * d_angle
+    dvy = d_speed * np.sin(angle) + speed * np.cos(angle) * d_angle
+
+    # Drag acceleration is c * v * (vx, vy) with c = 0.5 * rho * Cd * A / m
+    c = 0.5 * air_density * drag_coefficient * cross_sectional_area / m if drag else 0.0
+    dc = (0.5 * air_density * drag_coefficient * e["cross_sectional_area"] / m - c * e["m"] / m) if drag else np.zeros(n)
+
+    hit_y, d_hit_y = None, None
+
+    for _ in range(max_steps):
+        x_prev, y_prev, dx_prev, dy_prev = x, y, dx, dy
+
+        v = np.sqrt(vx**2 + vy**2)
+        dv = (vx * dvx + vy * dvy) / v
+        ax_drag, ay_drag = c * v * vx, c * v * vy
+        d_ax_drag = dc * v * vx + c * dv * vx + c * v * dvx
+        d_ay_drag = dc * v * vy + c * dv * vy + c * v * dvy
+
+        vx, dvx = vx - ax_drag * dt, dvx - d_ax_drag * dt
+        vy, dvy = vy - (g + ay_drag) * dt, dvy - d_ay_drag * dt
+
+        x, dx = x + vx * dt, dx + dvx * dt
+        y, dy = y + vy * dt, dy + dvy * dt
+
+        # Height where the track crosses the target line, interpolated within the step
+        if target_x is not None and hit_y is None and x_prev < target_x <= x:
+            s = (target_x - x_prev) / (x - x_prev)
+            ds = (-dx_prev * (x - x_prev) - (target_x - x_prev) * (dx - dx_prev)) / (x - x_prev) ** 2
+            hit_y = y_prev + s * (y - y_prev)
+            d_hit_y = dy_prev + ds * (y - y_prev) + s * (dy - dy_prev)
+
+        # Landing point, interpolated to y = 0 within the step
+        if y < 0:
+            s = y_prev / (y_prev - y)
+            ds = (-y * dy_prev + y_prev * dy) / (y_prev - y) ** 2
+            x_land = x_prev + s * (x - x_prev)
+            d_x_land = dx_prev + ds * (x - x_prev) + s * (dx - dx_prev)
+            break
+    else:
+        x_land, d_x_land = x, dx
+
+    return {
+        "range": x_land,
+        "d_range": dict(zip(sensitivity_params, d_x_land)),
+        "hit_y": hit_y,
+        "d_hit_y": dict(zip(sensitivity_params, d_hit_y)) if d_hit_y is not None else None,
+    }
+
+def compute_crossing(angle_grad, gunpowder, efficiency, m, M, cross_sectional_area,
+                     x0=0, y0=0, target_x=None, drag=True, dt=None, max_steps=100000):
+    # The state half of propagate_sensitivities: landing point and target-line hit height,
+    # interpolated the same way, without the cost of the tangent equations
+    dt = dt or time_step
+    angle = angle_grad * np.pi / 180
+    speed = np.sqrt((2 * efficiency * q * gunpowder) / (100 * m))
+
+    x, y = x0, y0
+    vx, vy = speed * np.cos(angle), speed * np.sin(angle)
+    c = 0.5 * air_density * drag_coefficient * cross_sectional_area / m if drag else 0.0
+
+    hit_y = None
+    x_land = None
+
+    for _ in range(max_steps):
+        x_prev, y_prev = x, y
+
+        v = np.sqrt(vx**2 + vy**2)
+        vx = vx - c * v * vx * dt
+        vy = vy - (g + c * v * vy) * dt
+        x = x + vx * dt
+        y = y + vy * dt
+
+        if target_x is not None and hit_y is None and x_prev < target_x <= x:
+            hit_y = y_prev + (target_x - x_prev) / (x - x_prev) * (y - y_prev)
+
+        if y < 0:
+            x_land = x_prev + y_prev / (y_prev - y) * (x - x_prev)
+            break
+    else:
+        x_land = x
+
+    return {"range": x_land, "hit_y": hit_y}
+
+def current_shot():
+    # Everything propagate_sensitivities needs, taken from the current settings
+    return {"angle_grad": angle_grad, "gunpowder": gunpowder, "efficiency": efficiency, "m": m, "M": M,
+            "cross_sectional_area": cross_sectional_area, "x0": x0, "y0": y0, "target_x": target_x,
+            "drag": apply_air_resistance}
+
+def compute_sensitivities():
+    return propagate_sensitivities(**current_shot())
+
+def find_reaching_value(param, value, evaluate):
+    # Starting point for solve_for_hit when the current shot falls short of the target line.
+    # For the angle this is the longest-range angle of a coarse scan; other parameters are
+    # scaled up and down until the track reaches the target line.
+    if param == "angle_grad":
+        results = [(angle, evaluate(angle)) for angle in np.arange(5.0, 90.0, 5.0)]
+        angle, result = max(results, key=lambda item: item[1]["range"])
+        return (angle, result) if result["hit_y"] is not None else (None, None)
+
+    for factor in (2, 0.5, 4, 0.25, 8, 0.125, 16, 0.0625):
+        result = evaluate(value * factor)
+        if result["hit_y"] is not None:
+            return value * factor, result
+    return None, None
+
+def solve_for_hit(goal_y, param="angle_grad", shot=None, tol=1e-3, max_iter=30, max_steps=100000, check=None):
+    # Newton iteration on one parameter so the track crosses the target line at goal_y.
+    # Steps that make the shot fall short of the target are halved until it reaches again.
+    # check, if given, is called on every candidate shot; a ValueError counts as a shot that falls short.
+    params = shot if shot is not None else current_shot()
+
+    def evaluate(value):
+        candidate = dict(params, **{param: value})
+        if check is not None:
+            try:
+                check(candidate)
+            except ValueError:
+                return {"range": -np.inf, "d_range": None, "hit_y": None, "d_hit_y": None}
+        return propagate_sensitivities(**candidate, max_steps=max_steps)
+
+    value = params[param]
+    result = evaluate(value)
+    if result["hit_y"] is None:
+        value, result = find_reaching_value(param, value, evaluate)
+        if value is None:
+            return None  # No value of param gets the shot to the target line
+
+    for _ in range(max_iter):
+        error = result["hit_y"] - goal_y
+        if abs(error) < tol:
+            return value
+        slope = result["d_hit_y"][param]
+        if slope == 0:
+            return None
+        step = -error / slope
+
+        for _ in range(max_iter):
+            candidate = value + step
+            if param == "angle_grad":
+                candidate = min(max(candidate, 0.1), 89.9)
+            else:
+                candidate = max(candidate, value / 10)  # Charges, masses and areas stay positive
+            candidate_result = evaluate(candidate)
+            if candidate_result["hit_y"] is not None:
+                break
+            step /= 2
+        else:
+            return None
+
+        value, result = candidate, candidate_result
+
+    return None
+
+def init_projectiles(angle_grad, gunpowder, efficiency, m, cross_sectional_area, x0, y0, dt=None):
+    # Structure-of-arrays state for a batch of projectiles; every parameter may be a scalar or an array
+    dt = dt or time_step
+    angle = np.asarray(angle_grad, dtype=float) * np.pi / 180
+    speed = np.sqrt((2 * np.asarray(efficiency) * q * np.asarray(gunpowder)) / (100 * np.asarray(m)))
+    shape = np.broadcast_shapes(angle.shape, speed.shape, np.shape(cross_sectional_area), np.shape(x0), np.shape(y0))
+    y_start = np.broadcast_to(np.asarray(y0, dtype=float), shape)
+
+    # Same flight time bound as update_config uses for a single shot
+    flight_time = (np.sin(angle) * speed + np.sqrt((np.sin(angle) * speed) ** 2 + 2 * g * y_start)) / g
+
+    return {
+        "x": np.broadcast_to(np.asarray(x0, dtype=float), shape).copy(),
+        "y": y_start.copy(),
+        "vx": np.broadcast_to(speed * np.cos(angle), shape).copy(),
+        "vy": np.broadcast_to(speed * np.sin(angle), shape).copy(),
+        "drag": np.broadcast_to(0.5 * air_density * drag_coefficient * np.asarray(cross_sectional_area) / np.asarray(m), shape).copy(),
+        "rising": np.broadcast_to(np.sin(angle) > 0, shape).copy(),
+        "steps_left": np.broadcast_to(np.ceil(np.round(flight_time / dt, 9)).astype(int), shape).copy(),
+        "active": np.ones(shape, dtype=bool),
+    }
+
+def advance_projectiles(state, dt=None, drag=True):
+    # One step of the compute_position_with_drag scheme for every projectile still in flight
+    dt = dt or time_step
+    active = state["active"]
+    vx, vy = state["vx"], state["vy"]
+    v = np.sqrt(vx**2 + vy**2)
+    c = state["drag"] if drag else 0.0
+
+    new_vx = vx - c * v * vx * dt
+    new_vy = vy - (g + c * v * vy) * dt
+
+    state["vx"] = np.where(active, new_vx, vx)
+    state["vy"] = np.where(active, new_vy, vy)
+    state["x"] = np.where(active, state["x"] + new_vx * dt, state["x"])
+    state["y"] = np.where(active, state["y"] + new_vy * dt, state["y"])
+    state["steps_left"] = state["steps_left"] - active
+
+    state["active"] = active & (state["steps_left"] > 0) & ~((state["y"] < 0) & state["rising"])
+
+def integrate_projectiles(state, dt=None, drag=True):
+    # Advance the whole batch until every projectile has landed; returns the position history
+    # (one row per step, one column per projectile) and the number of steps each one flew
+    dt = dt or time_step
+    xs, ys = [state["x"].copy()], [state["y"].copy()]
+    steps = np.zeros(state["x"].shape, dtype=int)
+    state["active"] &= state["steps_left"] > 0
+
+    while state["active"].any():
+        steps += state["active"]
+        advance_projectiles(state, dt=dt, drag=drag)
+        xs.append(state["x"].copy())
+        ys.append(state["y"].copy())
+
+    return np.array(xs), np.array(ys), steps
+
+def landing_points(xs, ys, steps):
+    # Landing point of each projectile in an integrate_projectiles history, interpolated to y = 0
+    # within the last step exactly as compute_crossing does
+    columns = np.arange(xs.shape[1])
+    x, y = xs[steps, columns], ys[steps, columns]
+    x_prev, y_prev = xs[np.maximum(steps - 1, 0), columns], ys[np.maximum(steps - 1, 0), columns]
+    below = (y < 0) & (steps > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        interpolated = x_prev + y_prev / (y_prev - y) * (x - x_prev)
+    return np.where(below, interpolated, x)
+
+def compute_recoil(t, angle_grad, gunpowder, efficiency, m, M, x_start):
+    # Vectorised version of compute_x(track="cannon") for a batch of guns
+    angle = np.asarray(angle_grad, dtype=float) * np.pi / 180
+    speed = np.sqrt((2 * np.asarray(efficiency) * q * np.asarray(gunpowder)) / (100 * np.asarray(m)))
+    recoil_speed = np.cos(angle) * speed * (np.asarray(m) / np.asarray(M))
+    deceleration = friction_coef * np.asarray(M) * g / r_wheel / np.asarray(M)
+    distance = recoil_speed ** 2 / (2 * deceleration)
+
+    moving = recoil_speed > deceleration * t
+    x = np.where(moving, x_start - recoil_speed * t + deceleration * (t ** 2) / 2, x_start - distance)
+    return x, distance
+
 def compute_x(t, track="bullet"):
     if track == "bullet":
         x, _ = compute_position_with_drag(t)
@@ -175,6 +458,8 @@ def compute_impulse(t=0, track="bullet"):
 def clear_track():
     for line in ax.get_lines():
         line.remove()
+    for collection in list(ax.collections):
+        collection.remove()
 
     # Re-plot saved trajectories with a distinct color and style
     for traj in trajectories:
@@ -190,19 +475,22 @@ def update_config():
     x_offset = x0
     y_offset = y0
 
-    if compute_x(time_interval, track="bullet") >= target_x:
-        t_hit = (target_x - x_offset) / (np.cos(angle) * initial_speed)
-        hit_y = compute_y(t_hit, track="bullet")
+    # Same interpolated crossing that Auto Aim solves against
+    hit_y = compute_crossing(**current_shot())["hit_y"]
 
-    return np.arange(0, time_interval, 0.1)
+    return np.arange(0, time_interval, frame_step)
 
 def plot_target():
     global target_x, target_height
 
     ax.plot([target_x, target_x], [0, target_height], color=main_color_1, lw=3)
 
-def plot_bars():
-    global time_interval, initial_speed, angle
+def compute_bar_data():
+    global time_interval, initial_speed, angle, bar_data_cache
+
+    key = (initial_speed, angle, time_interval, m, M, g, friction_coef, r_wheel)
+    if bar_data_cache["key"] == key:
+        return bar_data_cache["data"]
 
     y_impulses_data = [compute_impulse(track="bullet"), compute_impulse(track="cannon"),
                        compute_impulse(t=time_interval, track="cannon")]
@@ -212,22 +500,29 @@ def plot_bars():
 
     y_velocities_data = [initial_speed, np.cos(angle) * initial_speed, np.cos(angle) * initial_speed * (m / M)]
 
-    ax_impulses.clear()
-    ax_forces.clear()
-    ax_velocities.clear()
-
-    impulse_bar = ax_impulses.bar(["Projectile", "Cannon (1)", "Cannon (2)"], y_impulses_data, color=main_color_1)
-    force_bar = ax_forces.bar(["Friction C", "Reaction C", "Gravity P"], y_forces_data, color=main_color_1)
-    velocity_bar = ax_velocities.bar(["Initial P", "X-coordinate P", "Initial C"], y_velocities_data, color=main_color_1)
+    bar_data_cache = {"key": key, "data": (y_impulses_data, y_forces_data, y_velocities_data)}
+    return bar_data_cache["data"]
 
-    add_value_labels(ax_impulses, impulse_bar)
-    add_value_labels(ax_forces, force_bar)
-    add_value_labels(ax_velocities, velocity_bar)
+def plot_bars():
+    build_bar_panels()
+    y_impulses_data, y_forces_data, y_velocities_data = compute_bar_data()
+
+    # The bar panels are built on the first Fire; after that only heights, labels and limits change
+    for bar_ax, bars, labels, heights in ((ax_impulses, impulse_bar, impulse_labels, y_impulses_data),
+                                          (ax_forces, force_bar, force_labels, y_forces_data),
+                                          (ax_velocities, velocity_bar, velocity_labels, y_velocities_data)):
+        for bar, height in zip(bars, heights):
+            bar.set_height(height)
+        update_value_labels(labels, bars)
+        rescale_bars(bar_ax, heights)
 
 def stop_animation():
     global anim
     if anim:
         anim.event_source.stop()
+        anim = None
+        # A shot stopped mid-flight keeps only the points drawn so far; replay needs that length
+        log_event("stop", points=len(x_prev_data))
 
 def run_animation():
     global x_prev_data, y_prev_data, anim
@@ -247,7 +542,7 @@ def run_animation():
             current_trajectory_x.append(x_bullet)
             current_trajectory_y.append(y_bullet)
 
-            if target_x <= x_bullet and hit_y <= target_height and hit_check:
+            if hit_y is not None and target_x <= x_bullet and 0 <= hit_y <= target_height and hit_check:
                 ax.plot([target_x], [hit_y], "o", mfc=main_color_2, mec=main_color_2, markersize=8)
                 hit_check = False
 
@@ -270,12 +565,24 @@ def run_animation():
     x_prev_data = current_trajectory_x
     y_prev_data = current_trajectory_y
 
+    from matplotlib.animation import FuncAnimation
+
     anim = FuncAnimation(fig, func=update_track, frames=update_config(), interval=20, blit=False)
 
+def print_sensitivities(result):
+    print(f"Range: {result['range']:.2f} m")
+    for name in sensitivity_params:
+        print(f"  d/d {name}: {result['d_range'][name]:.4g}")
+    if result["hit_y"] is not None:
+        print(f"Hit height: {result['hit_y']:.2f} m")
+        for name in sensitivity_params:
+            print(f"  d/d {name}: {result['d_hit_y'][name]:.4g}")
+
 def launch(event):
     global hit_check
 
     stop_animation()  # Stop any existing animation
+    log_event("fire")
     hit_check = True
     clear_track()  # This will now re-plot saved trajectories
     update_config()  # Ensure configuration is updated
@@ -284,17 +591,127 @@ def launch(event):
     run_animation()
     plt.draw()  # Ensure the plot is updated
 
+def aim_at_target(event):
+    global angle_grad, shot_sensitivities
+
+    stop_animation()  # Stop any existing animation
+    new_angle = solve_for_hit(target_height / 2, param="angle_grad")
+    if new_angle is None:
+        get_root()
+        mbox.showerror("Aim Failed", "The target cannot be reached by changing the angle")
+        return
+    angle_grad = new_angle
+    log_event("aim", angle_grad=angle_grad)
+    launch(event)
+
+    # Gradients are only worked out on request, not on every Fire
+    shot_sensitivities = compute_sensitivities()
+    print_sensitivities(shot_sensitivities)
+
+def salvo_values(values, default):
+    # Expands a per-gun setting to one value per gun
+    if len(values) == 0:
+        return np.full(salvo_size, float(default))
+    if len(values) == 1:
+        return np.full(salvo_size, float(values[0]))
+    if len(values) != salvo_size:
+        raise ValueError(f"Expected 1 or {salvo_size} values, got {len(values)}")
+    return np.array(values, dtype=float)
+
+def compute_salvo(dt=None):
+    global salvo_recoil
+
+    dt = dt or time_step
+    guns = np.arange(salvo_size)
+    if len(salvo_recoil) != salvo_size:
+        salvo_recoil = np.zeros(salvo_size)
+
+    # Per-gun parameters, one entry per cannon
+    if salvo_angles:
+        gun_angles = salvo_values(salvo_angles, angle_grad)
+    else:
+        gun_angles = angle_grad + (guns - (salvo_size - 1) / 2) * salvo_spread
+    gun_gunpowder = salvo_values(salvo_gunpowder, gunpowder)
+    gun_efficiency = salvo_values(salvo_efficiency, efficiency)
+    gun_m = salvo_values(salvo_m, m)
+    gun_M = salvo_values(salvo_M, M)
+    gun_area = salvo_values(salvo_area, cross_sectional_area)
+    gun_x = x0 - guns * salvo_spacing - salvo_recoil
+    fire_steps = np.round(guns * salvo_delay / dt).astype(int)
+
+    state = init_projectiles(gun_angles, gun_gunpowder, gun_efficiency, gun_m, gun_area, gun_x, y0, dt=dt)
+    xs, ys, steps = integrate_projectiles(state, dt=dt, drag=apply_air_resistance)
+
+    t = np.arange(len(xs))[:, None] * dt
+    cannon_xs, recoil_distance = compute_recoil(t, gun_angles, gun_gunpowder, gun_efficiency, gun_m, gun_M, gun_x)
+    salvo_recoil = salvo_recoil + recoil_distance
+
+    # Step at which each projectile crosses the target line, with the height interpolated
+    # within that step exactly as compute_crossing does
+    in_flight = np.arange(1, len(xs))[:, None] <= steps
+    crossed = (xs[:-1] < target_x) & (target_x <= xs[1:]) & in_flight
+    cross_step = np.where(crossed.any(axis=0), crossed.argmax(axis=0) + 1, -1)
+    x, y = xs[np.maximum(cross_step, 1), guns], ys[np.maximum(cross_step, 1), guns]
+    x_prev, y_prev = xs[np.maximum(cross_step, 1) - 1, guns], ys[np.maximum(cross_step, 1) - 1, guns]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cross_y = np.where(cross_step > 0, y_prev + (target_x - x_prev) / (x - x_prev) * (y - y_prev), np.nan)
+    is_hit = (cross_step > 0) & (cross_y <= target_height) & (cross_y >= 0)
+    hit_frames = np.where(is_hit, fire_steps + cross_step, -1)
+
+    return {"xs": xs, "ys": ys, "steps": steps, "cannon_xs": cannon_xs, "fire_steps": fire_steps,
+            "cross_y": cross_y, "is_hit": is_hit, "hit_frames": hit_frames}
+
+def fire_salvo(event):
+    global anim
+
+    stop_animation()  # Stop any existing animation
+    log_event("salvo")
+    clear_track()
+    plot_target()
+
+    salvo = compute_salvo()
+    xs, ys, steps, cannon_xs = salvo["xs"], salvo["ys"], salvo["steps"], salvo["cannon_xs"]
+    fire_steps, cross_y, is_hit, hit_frames = salvo["fire_steps"], salvo["cross_y"], salvo["is_hit"], salvo["hit_frames"]
+
+    from matplotlib.animation import FuncAnimation
+    from matplotlib.collections import LineCollection
+
+    tracks = LineCollection([], colors=[main_color_2] * salvo_size + [main_color_1] * salvo_size, lw=3)
+    ax.add_collection(tracks)
+    hit_marks, = ax.plot([], [], "o", mfc=main_color_2, mec=main_color_2, markersize=8)
+
+    def update_salvo(frame):
+        local = np.clip(frame - fire_steps, -1, steps)
+        segments = [np.column_stack((xs[:n + 1, i], ys[:n + 1, i])) if n >= 0 else np.empty((0, 2))
+                    for i, n in enumerate(local)]
+        segments += [np.column_stack((cannon_xs[:n + 1, i], np.full(n + 1, y0))) if n >= 0 else np.empty((0, 2))
+                     for i, n in enumerate(local)]
+        tracks.set_segments(segments)
+
+        shown = is_hit & (hit_frames <= frame)
+        hit_marks.set_data(np.full(shown.sum(), target_x), cross_y[shown])
+
+        ax.relim()
+        ax.update_datalim(np.concatenate([segment for segment in segments if len(segment)] or [np.zeros((0, 2))]))
+        ax.autoscale_view(scalex=True, scaley=True)
+
+    anim = FuncAnimation(fig, func=update_salvo, frames=int((fire_steps + steps).max()) + 1, interval=20, blit=False)
+    plt.draw()
+
 def save_trajectory(event):
     global x_prev_data, y_prev_data, trajectories
     stop_animation()  # Stop any existing animation
     if x_prev_data and y_prev_data:
         trajectories.append({"x": x_prev_data.copy(), "y": y_prev_data.copy()})
+        log_event("save", points=len(x_prev_data))  # The shot may have been stopped mid-flight
         plt.draw()
 
 def clear_trajectories(event):
-    global trajectories
+    global trajectories, salvo_recoil
     stop_animation()  # Stop any existing animation
+    log_event("clear")
     trajectories.clear()
+    salvo_recoil = np.zeros(salvo_size)  # Guns return to their starting positions
     clear_track()
     plt.draw()
 
@@ -302,18 +719,30 @@ def toggle_air_resistance(event):
     global apply_air_resistance
     stop_animation()  # Stop any existing animation
     apply_air_resistance = not apply_air_resistance
+    log_event("air_resistance", value=apply_air_resistance)
     if apply_air_resistance:
         button_toggle_air_resistance.label.set_text("Air Resistance: ON")
     else:
         button_toggle_air_resistance.label.set_text("Air Resistance: OFF")
     plt.draw()
 
+def parse_values(text):
+    return [float(value) for value in text.split(",") if value.strip()]
+
 def open_modal():
     stop_animation()  # Stop any existing animation
 
     def on_submit():
         global angle_grad, gunpowder, efficiency, x0, y0, target_x, target_height, m, M, cross_sectional_area
+        global salvo_size, salvo_delay, salvo_spread, salvo_spacing
+        global salvo_angles, salvo_gunpowder, salvo_efficiency, salvo_m, salvo_M, salvo_area
         try:
+            # Per-gun lists are checked against the new gun count before anything is changed
+            new_salvo_size = max(1, int(entry_salvo_size.get()))
+            gun_lists = [parse_values(entry.get()) for entry in gun_entries]
+            for values in gun_lists:
+                if len(values) not in (0, 1, new_salvo_size):
+                    raise ValueError
             angle_grad = float(entry_angle.get())
             gunpowder = float(entry_gunpowder.get())
             efficiency = float(entry_efficiency.get())
@@ -324,11 +753,19 @@ def open_modal():
             m = float(entry_bullet_m.get())
             M = float(entry_cannon_m.get())
             cross_sectional_area = float(entry_cross_sectional_area.get())
+            salvo_delay = float(entry_salvo_delay.get())
+            salvo_spread = float(entry_salvo_spread.get())
+            salvo_spacing = float(entry_salvo_spacing.get())
         except ValueError:
-            mbox.showerror("Invalid Input", "Please enter valid numeric values")
+            mbox.showerror("Invalid Input", "Please enter valid numeric values "
+                                            "(per-gun lists need 1 value or one per gun, comma-separated)")
             return
+        salvo_size = new_salvo_size
+        salvo_angles, salvo_gunpowder, salvo_efficiency, salvo_m, salvo_M, salvo_area = gun_lists
+        log_event("params", params=get_params())
         modal.destroy()
 
+    root = get_root()  # Also imports tkinter on first use
     modal = tk.Toplevel(root)
     modal.title("Input Parameters")
 
@@ -382,30 +819,313 @@ def open_modal():
     entry_cross_sectional_area.insert(0, str(cross_sectional_area))
     entry_cross_sectional_area.grid(row=9, column=1)
 
-    tk.Button(modal, text="Submit", command=on_submit).grid(row=10, columnspan=2)
-
-root = tk.Tk()
-root.withdraw()  # Hide the root window
-
-axButton_modal = plt.axes([0.7, 0.02, 0.1, 0.04])
-button_modal = Button(axButton_modal, 'Input Params')
-button_modal.on_clicked(lambda event: open_modal())
-
-axButton_launch = plt.axes([0.8, 0.02, 0.1, 0.04])
-button_launch = Button(axButton_launch, 'Fire')
-button_launch.on_clicked(launch)
-
-axButton_save_trajectory = plt.axes([0.4, 0.02, 0.1, 0.04])
-button_save_trajectory = Button(axButton_save_trajectory, 'Save Shot')
-button_save_trajectory.on_clicked(save_trajectory)
-
-axButton_clear_trajectories = plt.axes([0.3, 0.02, 0.1, 0.04])
-button_clear_trajectories = Button(axButton_clear_trajectories, 'Clear Shots')
-button_clear_trajectories.on_clicked(clear_trajectories)
-
-axButton_toggle_air_resistance = plt.axes([0.5, 0.02, 0.1, 0.04])
-button_toggle_air_resistance = Button(axButton_toggle_air_resistance, 'Air Resistance: ON')
-button_toggle_air_resistance.on_clicked(toggle_air_resistance)
-
-plt.subplots_adjust(hspace=1)
-plt.show()
+    tk.Label(modal, text="Salvo guns").grid(row=10, column=0)
+    entry_salvo_size = tk.Entry(modal)
+    entry_salvo_size.insert(0, str(salvo_size))
+    entry_salvo_size.grid(row=10, column=1)
+
+    tk.Label(modal, text="Salvo delay, s").grid(row=11, column=0)
+    entry_salvo_delay = tk.Entry(modal)
+    entry_salvo_delay.insert(0, str(salvo_delay))
+    entry_salvo_delay.grid(row=11, column=1)
+
+    tk.Label(modal, text="Salvo angle step, °").grid(row=12, column=0)
+    entry_salvo_spread = tk.Entry(modal)
+    entry_salvo_spread.insert(0, str(salvo_spread))
+    entry_salvo_spread.grid(row=12, column=1)
+
+    tk.Label(modal, text="Salvo gun spacing, m").grid(row=13, column=0)
+    entry_salvo_spacing = tk.Entry(modal)
+    entry_salvo_spacing.insert(0, str(salvo_spacing))
+    entry_salvo_spacing.grid(row=13, column=1)
+
+    # Per-gun values as comma-separated lists; left empty, every gun uses the values above
+    gun_entries = []
+    for row, (label, values) in enumerate((("Salvo angles, °", salvo_angles),
+                                           ("Salvo gunpowder, g", salvo_gunpowder),
+                                           ("Salvo efficiency, %", salvo_efficiency),
+                                           ("Salvo projectile masses, kg", salvo_m),
+                                           ("Salvo cannon masses, kg", salvo_M),
+                                           ("Salvo cross-sectional areas, m²", salvo_area)), start=14):
+        tk.Label(modal, text=label).grid(row=row, column=0)
+        entry = tk.Entry(modal)
+        entry.insert(0, ", ".join(str(value) for value in values))
+        entry.grid(row=row, column=1)
+        gun_entries.append(entry)
+
+    tk.Button(modal, text="Submit", command=on_submit).grid(row=20, columnspan=2)
+
+def get_params():
+    return {name: globals()[name] for name in session_params}
+
+def set_params(params):
+    globals().update({name: params[name] for name in session_params if name in params})
+
+def open_event_log(path):
+    global event_log
+    event_log = open(path, "a")
+
+def log_event(kind, **data):
+    # Append-only, one JSON object per line, flushed so a crash keeps everything logged so far
+    if event_log is None:
+        return
+    event_log.write(json.dumps({"event": kind, "time": time.time(), **data}) + "\n")
+    event_log.flush()
+
+def save_snapshot(path):
+    lengths = [len(traj["x"]) for traj in trajectories]
+    np.savez_compressed(
+        path,
+        params=np.array(json.dumps(get_params())),
+        trajectory_lengths=np.array(lengths, dtype=int),
+        trajectory_x=np.concatenate([traj["x"] for traj in trajectories]) if trajectories else np.zeros(0),
+        trajectory_y=np.concatenate([traj["y"] for traj in trajectories]) if trajectories else np.zeros(0),
+        prev_x=np.array(x_prev_data, dtype=float),
+        prev_y=np.array(y_prev_data, dtype=float),
+        salvo_recoil=salvo_recoil,
+    )
+
+def load_snapshot(path):
+    global trajectories, x_prev_data, y_prev_data, salvo_recoil
+
+    with np.load(path) as data:
+        set_params(json.loads(data["params"].item()))
+        bounds = np.cumsum(np.concatenate([[0], data["trajectory_lengths"]]))
+        trajectories = [{"x": list(data["trajectory_x"][start:end]), "y": list(data["trajectory_y"][start:end])}
+                        for start, end in zip(bounds[:-1], bounds[1:])]
+        x_prev_data, y_prev_data = list(data["prev_x"]), list(data["prev_y"])
+        salvo_recoil = data["salvo_recoil"].copy()
+
+def get_state():
+    # Everything a snapshot holds, as plain JSON values so it can go into the session log
+    return {
+        "params": get_params(),
+        "trajectories": [{"x": [float(v) for v in traj["x"]], "y": [float(v) for v in traj["y"]]}
+                         for traj in trajectories],
+        "prev_x": [float(v) for v in x_prev_data],
+        "prev_y": [float(v) for v in y_prev_data],
+        "salvo_recoil": [float(v) for v in salvo_recoil],
+    }
+
+def set_state(state):
+    global trajectories, x_prev_data, y_prev_data, salvo_recoil
+
+    set_params(state["params"])
+    trajectories = [{"x": list(traj["x"]), "y": list(traj["y"])} for traj in state["trajectories"]]
+    x_prev_data, y_prev_data = list(state["prev_x"]), list(state["prev_y"])
+    salvo_recoil = np.array(state["salvo_recoil"], dtype=float)
+
+def compute_shot():
+    # The track the Fire animation draws, computed frame by frame without animating
+    current_trajectory_x, current_trajectory_y = [], []
+    for t in update_config():
+        x_bullet = compute_x(t, track="bullet")
+        if x_bullet not in current_trajectory_x:
+            current_trajectory_x.append(x_bullet)
+            current_trajectory_y.append(compute_y(t, track="bullet"))
+    return current_trajectory_x, current_trajectory_y
+
+def apply_event(entry):
+    global trajectories, x_prev_data, y_prev_data, salvo_recoil, angle_grad, apply_air_resistance
+
+    kind = entry["event"]
+    if kind == "start":
+        trajectories, x_prev_data, y_prev_data = [], [], []
+        salvo_recoil = np.zeros(salvo_size)
+        if "state" in entry:
+            # The starting state is embedded, so the log replays without the snapshot it was restored from
+            set_state(entry["state"])
+        else:
+            set_params(entry["params"])
+    elif kind == "params":
+        set_params(entry["params"])
+    elif kind == "aim":
+        angle_grad = entry["angle_grad"]
+    elif kind == "air_resistance":
+        apply_air_resistance = entry["value"]
+    elif kind == "fire":
+        x_prev_data, y_prev_data = compute_shot()
+    elif kind == "salvo":
+        compute_salvo()
+    elif kind == "stop":
+        x_prev_data, y_prev_data = x_prev_data[:entry["points"]], y_prev_data[:entry["points"]]
+    elif kind == "save":
+        if x_prev_data and y_prev_data:
+            points = entry.get("points", len(x_prev_data))
+            x_prev_data, y_prev_data = x_prev_data[:points], y_prev_data[:points]
+            trajectories.append({"x": x_prev_data.copy(), "y": y_prev_data.copy()})
+    elif kind == "clear":
+        trajectories.clear()
+        salvo_recoil = np.zeros(salvo_size)
+
+def replay_session(path):
+    # Re-applies a session log at full speed, without any GUI or animation
+    counts, timings = {}, {}
+    with open(path) as log_file:
+        for line in log_file:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            start = time.perf_counter()
+            apply_event(entry)
+            elapsed = time.perf_counter() - start
+            counts[entry["event"]] = counts.get(entry["event"], 0) + 1
+            timings[entry["event"]] = timings.get(entry["event"], 0) + elapsed
+    return counts, timings
+
+def import_gui():
+    global plt, GridSpec, Button
+
+    import matplotlib.pyplot as plt
+    from matplotlib.gridspec import GridSpec
+    from matplotlib.widgets import Button
+
+def get_root():
+    # The Tk root is only needed for the parameter modal and message boxes
+    global root, tk, mbox
+
+    if root is None:
+        import tkinter as tk
+        from tkinter import messagebox as mbox
+
+        root = tk.Tk()
+        root.withdraw()  # Hide the root window
+    return root
+
+def build_bar_panels():
+    global ax_impulses, ax_forces, ax_velocities, impulse_bar, force_bar, velocity_bar
+    global impulse_labels, force_labels, velocity_labels
+
+    if ax_impulses is not None:
+        return
+
+    # Top Bars:
+    ax_impulses = fig.add_subplot(gs[0, :3], facecolor=bg_color)
+    impulse_bar = ax_impulses.bar(["Projectile", "Cannon (1)", "Cannon (2)"], [0, 0, 0], color=main_color_1)
+    ax_impulses.set_xlabel("Impulses, kg*m/s")
+    ax_impulses.grid(True)
+
+    ax_forces = fig.add_subplot(gs[0, 3:6], facecolor=bg_color)
+    force_bar = ax_forces.bar(["Friction C", "Reaction C", "Gravity P"], [0, 0, 0], color=main_color_1)
+    ax_forces.set_xlabel("Forces, N")
+    ax_forces.grid(True)
+
+    ax_velocities = fig.add_subplot(gs[0, 6:], facecolor=bg_color)
+    velocity_bar = ax_velocities.bar(["Initial P", "X-coordinate P", "Initial C"], [0, 0, 0], color=main_color_1)
+    ax_velocities.set_xlabel("Velocities, m/s")
+    ax_velocities.grid(True)
+
+    impulse_labels = add_value_labels(ax_impulses, impulse_bar)
+    force_labels = add_value_labels(ax_forces, force_bar)
+    velocity_labels = add_value_labels(ax_velocities, velocity_bar)
+
+def build_gui():
+    # Only the main plane and the buttons are built up front; the bar panels wait for the first Fire
+    global fig, ax, gs
+    global button_modal, button_launch, button_salvo, button_save_trajectory, button_clear_trajectories
+    global button_aim, button_toggle_air_resistance
+
+    import_gui()
+    startup_times["imports"] = time.perf_counter() - startup_begin
+
+    plt.style.use('Solarize_Light2')
+
+    fig = plt.figure()
+    fig.patch.set_facecolor("#d9d3c0")
+    fig.suptitle("Cannon Lab", fontsize=14, fontweight="bold", color = "#ff7f0e")
+
+    # Proportions:
+    hs = [15/50, 15/50, 5/50, 5/50, 5/50, 5/50]  # Adjusted to make top bars taller
+    ws = [1/8, 1/8, 1/8, 1/8, 1/8, 1/8, 1/8, 1/8]
+
+    gs = GridSpec(ncols=8, nrows=6, width_ratios=ws, height_ratios=hs, figure=fig)
+
+    # Main plane:
+    ax = plt.subplot(gs[1:, :], facecolor=bg_color)
+    ax.set_aspect("auto")
+
+    plt.xlabel("x, m")
+    plt.ylabel("y, m")
+    plt.grid(True)
+
+    axButton_modal = plt.axes([0.7, 0.02, 0.1, 0.04])
+    button_modal = Button(axButton_modal, 'Input Params')
+    button_modal.on_clicked(lambda event: open_modal())
+
+    axButton_launch = plt.axes([0.8, 0.02, 0.1, 0.04])
+    button_launch = Button(axButton_launch, 'Fire')
+    button_launch.on_clicked(launch)
+
+    axButton_salvo = plt.axes([0.2, 0.02, 0.1, 0.04])
+    button_salvo = Button(axButton_salvo, 'Salvo')
+    button_salvo.on_clicked(fire_salvo)
+
+    axButton_save_trajectory = plt.axes([0.4, 0.02, 0.1, 0.04])
+    button_save_trajectory = Button(axButton_save_trajectory, 'Save Shot')
+    button_save_trajectory.on_clicked(save_trajectory)
+
+    axButton_clear_trajectories = plt.axes([0.3, 0.02, 0.1, 0.04])
+    button_clear_trajectories = Button(axButton_clear_trajectories, 'Clear Shots')
+    button_clear_trajectories.on_clicked(clear_trajectories)
+
+    axButton_aim = plt.axes([0.6, 0.02, 0.1, 0.04])
+    button_aim = Button(axButton_aim, 'Auto Aim')
+    button_aim.on_clicked(aim_at_target)
+
+    axButton_toggle_air_resistance = plt.axes([0.5, 0.02, 0.1, 0.04])
+    button_toggle_air_resistance = Button(axButton_toggle_air_resistance, 'Air Resistance: ' + ('ON' if apply_air_resistance else 'OFF'))
+    button_toggle_air_resistance.on_clicked(toggle_air_resistance)
+
+    plt.subplots_adjust(hspace=1)
+    startup_times["figure"] = time.perf_counter() - startup_begin
+
+    fig.canvas.mpl_connect("draw_event", report_startup)
+
+def report_startup(event):
+    # Runs on every draw but only reports the first one, when the window first has content
+    if "first_draw" in startup_times:
+        return
+    startup_times["first_draw"] = time.perf_counter() - startup_begin
+    print("Startup: " + ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in startup_times.items()))
+    log_event("startup", **{stage: seconds for stage, seconds in startup_times.items()})
+
+def main():
+    global time_step, frame_step
+
+    parser = argparse.ArgumentParser(description="Cannon Lab")
+    parser.add_argument("--log", help="record session events by appending them to this file")
+    parser.add_argument("--restore", help="start from a snapshot written with --snapshot")
+    parser.add_argument("--snapshot", help="write a snapshot of the final state to this file")
+    parser.add_argument("--replay", help="replay a session log headlessly instead of opening the window")
+    parser.add_argument("--dt", type=float, help=f"integration step, s (default {time_step})")
+    parser.add_argument("--frame-dt", type=float, help=f"simulated time between animation frames, s (default {frame_step})")
+    args = parser.parse_args()
+
+    time_step = args.dt or time_step
+    frame_step = args.frame_dt or frame_step
+
+    if args.replay:
+        counts, timings = replay_session(args.replay)
+        for kind in counts:
+            print(f"{kind:>15}: {counts[kind]:5d} events, {timings[kind] * 1000:9.2f} ms")
+        print(f"{'total':>15}: {sum(counts.values()):5d} events, {sum(timings.values()) * 1000:9.2f} ms")
+        if args.snapshot:
+            save_snapshot(args.snapshot)
+        return
+
+    if args.restore:
+        load_snapshot(args.restore)
+    if args.log:
+        open_event_log(args.log)
+    # restored_from is only a label; replay uses the embedded state, which survives the snapshot being overwritten
+    log_event("start", state=get_state(), restored_from=os.path.basename(args.restore) if args.restore else None)
+
+    build_gui()
+    clear_track()  # Draws any trajectories restored from the snapshot
+    fig.canvas.mpl_connect("close_event", lambda event: stop_animation())  # Logs a shot cut short by closing
+    if args.snapshot:
+        fig.canvas.mpl_connect("close_event", lambda event: save_snapshot(args.snapshot))
+    plt.show()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+from collections import OrderedDict
+
+import numpy as np
+
+import main as cannon
+
+# Request fields describing one shot; anything missing falls back to the Cannon Lab defaults
+shot_fields = ["angle_grad", "gunpowder", "efficiency", "m", "M", "cross_sectional_area", "x0", "y0", "drag"]
+
+ws_guid = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+ws_frame_points = 64  # Track points per streamed WebSocket frame
+
+max_steps = 5000  # Longest flight accepted, in integration steps
+max_sweep_values = 1000  # Most values in one sweep
+
+def parse_shot(request):
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object")
+    defaults = cannon.current_shot()
+    shot = {}
+    for name in shot_fields:
+        value = request.get(name, defaults[name])
+        if name == "drag":
+            if not isinstance(value, bool):
+                raise ValueError("drag must be true or false")
+            shot[name] = value
+        else:
+            shot[name] = float(value)
+            if not np.isfinite(shot[name]):
+                raise ValueError(f"{name} must be a finite number")
+    for name in ("gunpowder", "efficiency", "m", "M"):
+        if not shot[name] > 0:
+            raise ValueError(f"{name} must be positive")
+    check_flight_time(shot)
+    return shot
+
+def check_flight_time(shot):
+    # Same drag-free bound init_projectiles stops at; a batch runs as long as its longest shot,
+    # so one huge charge must not hold up every request batched with it
+    angle = shot["angle_grad"] * np.pi / 180
+    speed = np.sqrt((2 * shot["efficiency"] * cannon.q * shot["gunpowder"]) / (100 * shot["m"]))
+    flight_time = (np.sin(angle) * speed + np.sqrt((np.sin(angle) * speed) ** 2 + 2 * cannon.g * shot["y0"])) / cannon.g
+    if not flight_time / cannon.time_step <= max_steps:
+        raise ValueError(f"Flight would take more than {max_steps} steps of {cannon.time_step} s")
+
+class ResultCache:
+    # Bounded least-recently-used cache of finished results
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+class SimulationBatcher:
+    # Collects simulate requests arriving within `window` seconds and integrates them as one batch
+
+    def __init__(self, cache, window=0.002, max_batch=256):
+        self.cache = cache
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = []
+        self.in_flight = {}
+        self.flush_handle = None
+        self.batches = 0
+        self.batched_shots = 0
+        self.tasks = set()
+
+    async def simulate(self, shot):
+        key = ("simulate",) + tuple(shot[name] for name in shot_fields)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Identical requests already waiting share one slot in the batch
+        future = self.in_flight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.in_flight[key] = future
+            self.pending.append((key, shot, future))
+            if len(self.pending) >= self.max_batch:
+                self.flush()
+            elif self.flush_handle is None:
+                self.flush_handle = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self.run_batch(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_batch(self, batch):
+        # The integration runs in a worker thread so the event loop keeps accepting requests
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, simulate_batch, [shot for _, shot, _ in batch])
+        except Exception as error:
+            for key, _, future in batch:
+                del self.in_flight[key]
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self.batches += 1
+        self.batched_shots += len(batch)
+        for (key, _, future), result in zip(batch, results):
+            self.cache.put(key, result)
+            del self.in_flight[key]
+            if not future.done():
+                future.set_result(result)
+
+def simulate_batch(shots):
+    dt = cannon.time_step
+    columns = {name: np.array([shot[name] for shot in shots], dtype=float) for name in shot_fields}
+    state = cannon.init_projectiles(columns["angle_grad"], columns["gunpowder"], columns["efficiency"], columns["m"],
+                                    columns["cross_sectional_area"], columns["x0"], columns["y0"], dt=dt)
+    state["drag"] = state["drag"] * columns["drag"]  # Shots without air resistance get a zero drag coefficient
+    xs, ys, steps = cannon.integrate_projectiles(state, dt=dt, drag=True)
+    ranges = cannon.landing_points(xs, ys, steps)
+
+    results = []
+    for i, n in enumerate(steps):
+        track_x, track_y = xs[:n + 1, i], ys[:n + 1, i]
+        results.append({
+            "x": track_x.tolist(),
+            "y": track_y.tolist(),
+            "range": float(ranges[i]),
+            "max_height": float(track_y.max()),
+            "flight_time": float(n * dt),
+        })
+    return results
+
+def sweep(request):
+    dt = cannon.time_step
+    shot = parse_shot(request)
+    param = request["param"]
+    if param not in shot_fields or param == "drag":
+        raise ValueError(f"Cannot sweep over {param!r}")
+    if not isinstance(request["values"], list):
+        raise ValueError("values must be a JSON list")
+    values = [float(value) for value in request["values"]]
+    if len(values) > max_sweep_values:
+        raise ValueError(f"At most {max_sweep_values} values per sweep")
+    for value in values:
+        parse_shot(dict(request, **{param: value}))
+
+    columns = {name: np.full(len(values), shot[name], dtype=float) for name in shot_fields}
+    columns[param] = np.array(values)
+    state = cannon.init_projectiles(columns["angle_grad"], columns["gunpowder"], columns["efficiency"], columns["m"],
+                                    columns["cross_sectional_area"], columns["x0"], columns["y0"], dt=dt)
+    xs, ys, steps = cannon.integrate_projectiles(state, dt=dt, drag=shot["drag"])
+
+    return {
+        "param": param,
+        "values": values,
+        "range": cannon.landing_points(xs, ys, steps).tolist(),
+        "max_height": ys.max(axis=0).tolist(),
+        "flight_time": (steps * dt).tolist(),
+    }
+
+def aim(request):
+    shot = parse_shot(request)
+    shot["target_x"] = float(request.get("target_x", cannon.target_x))
+    goal_y = float(request.get("goal_y", cannon.target_height / 2))
+    if not (np.isfinite(shot["target_x"]) and np.isfinite(goal_y)):
+        raise ValueError("target_x and goal_y must be finite numbers")
+    param = request.get("param", "angle_grad")
+    if param not in cannon.sensitivity_params:
+        raise ValueError(f"Cannot aim with {param!r}")
+
+    # Every Newton candidate gets the same checks as the request, so no step can run away
+    value = cannon.solve_for_hit(goal_y, param=param, shot=shot, max_steps=max_steps, check=parse_shot)
+    if value is None:
+        return {"param": param, "value": None}
+
+    shot[param] = value
+    sensitivities = cannon.propagate_sensitivities(**shot, max_steps=max_steps)
+    return {
+        "param": param,
+        "value": float(value),
+        "range": float(sensitivities["range"]),
+        "hit_y": float(sensitivities["hit_y"]),
+        "d_range": {name: float(grad) for name, grad in sensitivities["d_range"].items()},
+        "d_hit_y": {name: float(grad) for name, grad in sensitivities["d_hit_y"].items()},
+    }
+
+class SimulationServer:
+
+    def __init__(self, window=0.002, max_batch=256, cache_size=1024):
+        self.cache = ResultCache(cache_size)
+        self.batcher = SimulationBatcher(self.cache, window=window, max_batch=max_batch)
+        self.requests = 0
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "cache_entries": len(self.cache.entries),
+            "batches": self.batcher.batches,
+            "batched_shots": self.batcher.batched_shots,
+        }
+
+    async def dispatch(self, op, request):
+        self.requests += 1
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+        if op == "simulate":
+            return await self.batcher.simulate(parse_shot(request))
+        if op not in ("sweep", "aim"):
+            raise ValueError(f"Unknown op {op!r}")
+
+        key = (op, json.dumps({name: value for name, value in request.items() if name not in ("id", "op")},
+                              sort_keys=True))
+        result = self.cache.get(key)
+        if result is None:
+            # Both are CPU-bound, keep them off the event loop
+            result = await asyncio.get_running_loop().run_in_executor(None, sweep if op == "sweep" else aim, request)
+            self.cache.put(key, result)
+        return result
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self.serve_websocket(reader, writer, headers)
+                    break
+
+                status, payload = await self.route(method, path, body)
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if method == "GET" and path == "/stats":
+            return "200 OK", self.stats()
+        if method != "POST" or path.lstrip("/") not in ("simulate", "sweep", "aim"):
+            return "404 Not Found", {"error": f"No endpoint {method} {path}"}
+        try:
+            request = json.loads(body or b"{}")
+            return "200 OK", await self.dispatch(path.lstrip("/"), request)
+        except (ValueError, KeyError, TypeError) as error:
+            return "400 Bad Request", {"error": str(error)}
+
+    async def serve_websocket(self, reader, writer, headers):
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + ws_guid).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def send(message, opcode=0x1):
+            async with lock:
+                write_ws_frame(writer, message, opcode)
+                await writer.drain()
+
+        async def answer(message):
+            if not isinstance(message, dict):
+                await send(json.dumps({"error": "Message must be a JSON object", "done": True}).encode())
+                return
+            request_id = message.get("id")
+            op = message.get("op", "simulate")
+            try:
+                result = await self.dispatch(op, message)
+            except (ValueError, KeyError, TypeError) as error:
+                await send(json.dumps({"id": request_id, "op": op, "error": str(error), "done": True}).encode())
+                return
+
+            if op == "simulate":
+                # Stream the track a few points at a time, then a closing frame with the summary
+                for seq, start in enumerate(range(0, len(result["x"]), ws_frame_points)):
+                    await send(json.dumps({"id": request_id, "op": op, "seq": seq,
+                                           "x": result["x"][start:start + ws_frame_points],
+                                           "y": result["y"][start:start + ws_frame_points]}).encode())
+                summary = {key: value for key, value in result.items() if key not in ("x", "y")}
+                await send(json.dumps({"id": request_id, "op": op, "done": True, **summary}).encode())
+            else:
+                await send(json.dumps({"id": request_id, "op": op, "done": True, **result}).encode())
+
+        try:
+            while True:
+                opcode, data = await read_ws_frame(reader)
+                if opcode == 0x8:  # Close
+                    await send(data[:2], opcode=0x8)
+                    break
+                elif opcode == 0x9:  # Ping
+                    await send(data, opcode=0xA)
+                elif opcode == 0x1:
+                    try:
+                        message = json.loads(data)
+                    except ValueError:
+                        await send(json.dumps({"error": "Invalid JSON", "done": True}).encode())
+                        continue
+                    # Each message runs as its own task so requests on one socket can share a batch
+                    task = asyncio.create_task(answer(message))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+async def read_ws_frame(reader):
+    head = await reader.readexactly(2)
+    opcode = head[0] & 0x0F
+    masked = head[1] & 0x80
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if masked else None
+    data = await reader.readexactly(length)
+    if mask:
+        data = (np.frombuffer(data, dtype=np.uint8) ^ np.resize(np.frombuffer(mask, dtype=np.uint8), length)).tobytes()
+    return opcode, data
+
+def write_ws_frame(writer, data, opcode=0x1):
+    length = len(data)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    writer.write(header + data)
+
+async def serve(host, port, window, max_batch, cache_size):
+    simulation_server = SimulationServer(window=window, max_batch=max_batch, cache_size=cache_size)
+    server = await asyncio.start_server(simulation_server.handle_connection, host, port)
+    print(f"Serving Cannon Lab simulations on http://{host}:{port} (WebSocket at /ws)")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    global max_steps
+
+    parser = argparse.ArgumentParser(description="Local Cannon Lab simulation server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--window", type=float, default=2.0, help="batching window, ms")
+    parser.add_argument("--max-batch", type=int, default=256, help="largest number of shots per batch")
+    parser.add_argument("--cache-size", type=int, default=1024, help="number of results kept in the cache")
+    parser.add_argument("--max-steps", type=int, default=max_steps, help="longest flight accepted, integration steps")
+    args = parser.parse_args()
+
+    max_steps = args.max_steps
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.window / 1000, args.max_batch, args.cache_size))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()